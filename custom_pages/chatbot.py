@@ -1,5 +1,11 @@
 # pages/chatbot.py - Fixed Chatbot page module
 import os
+import asyncio
+import functools
+import queue
+import threading
+import chromadb
+import httpx
 import streamlit as st
 from dotenv import load_dotenv
 import traceback
@@ -7,112 +13,188 @@ import traceback
 # LangChain imports
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_chroma import Chroma
-from langchain_ollama import OllamaEmbeddings
+from langchain_ollama import ChatOllama, OllamaEmbeddings
 from langchain.chat_models import init_chat_model
+from langchain_core.exceptions import OutputParserException
 from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnablePassthrough
 from langchain_core.tools import tool
 
 # Load environment variables
 load_dotenv()
 
+# Route questions through the multi-step tool-calling agent instead of the direct RAG chain
+USE_AGENT = os.getenv("USE_AGENT") == "1"
+
+# Retrieval sizing: documents passed to the LLM, characters kept per document
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "2"))
+MAX_CONTEXT_CHARS = int(os.getenv("MAX_CONTEXT_CHARS", "500"))
+
+# Number of chat messages rendered per page of history
+VISIBLE_MESSAGES = 20
+
 # Initialize components (only once to avoid reloading)
 @st.cache_resource
-def initialize_rag_components():
-    """Initialize RAG components with caching to improve performance"""
+def get_embeddings():
+    """Initialize the embedding model (cached separately from the agent)"""
+    embedding_model = os.getenv("EMBEDDING_MODEL")
+    if not embedding_model:
+        raise ValueError("EMBEDDING_MODEL not set in environment")
     
-    try:
-        # Initialize Embeddings
-        embedding_model = os.getenv("EMBEDDING_MODEL")
-        if not embedding_model:
-            raise ValueError("EMBEDDING_MODEL not set in environment")
-        
-        embeddings = OllamaEmbeddings(model=embedding_model)
-        
-        # Initialize Vector Store
-        vector_store = Chroma(
-            collection_name=os.getenv("COLLECTION_NAME", "default_collection"),
-            embedding_function=embeddings,
-            persist_directory=os.getenv("DATABASE_LOCATION", "./chroma_db")
-        )
-        
-        # Test vector store
-        test_results = vector_store.similarity_search("test", k=1)
-        
-        # Initialize Chat Model
-        llm = init_chat_model(
-            os.getenv("CHAT_MODEL", "llama3"),
-            model_provider=os.getenv("MODEL_PROVIDER", "ollama"),
-            temperature=0
+    # Let Ollama use every core for the embedding forward pass
+    return OllamaEmbeddings(model=embedding_model, num_thread=os.cpu_count())
+
+@st.cache_resource
+def get_chroma_client():
+    """Open one persistent Chroma client shared by every script run in this process"""
+    return chromadb.PersistentClient(
+        path=os.getenv("DATABASE_LOCATION", "./chroma_db"),
+        settings=chromadb.Settings(anonymized_telemetry=False)
+    )
+
+@st.cache_resource
+def get_vector_store():
+    """Initialize the Chroma vector store handle"""
+    ef_search = int(os.getenv("HNSW_EF_SEARCH", "64"))
+    vector_store = Chroma(
+        client=get_chroma_client(),
+        collection_name=os.getenv("COLLECTION_NAME", "default_collection"),
+        embedding_function=get_embeddings(),
+        # HNSW index settings (applied when the collection is created; space, M and
+        # construction_ef are fixed from then on and only change by re-ingesting)
+        collection_metadata={
+            "hnsw:space": "cosine",
+            "hnsw:M": 32,
+            "hnsw:construction_ef": 200,
+            "hnsw:search_ef": ef_search
+        }
+    )
+    
+    # ef_search is a query-time knob, so apply it to an existing collection too
+    hnsw = (vector_store._collection.configuration_json or {}).get("hnsw")
+    if hnsw and hnsw.get("ef_search") != ef_search:
+        vector_store._collection.modify(configuration={"hnsw": {"ef_search": ef_search}})
+    return vector_store
+
+@st.cache_resource
+def get_llm():
+    """Initialize the chat model"""
+    model_provider = os.getenv("MODEL_PROVIDER", "ollama")
+    if model_provider == "ollama":
+        # Explicit ChatOllama so the async (httpx.AsyncClient) path and its timeout are configurable.
+        # The client is cached with this model, so it is only ever driven from get_event_loop()
+        return ChatOllama(
+            model=os.getenv("CHAT_MODEL", "llama3"),
+            temperature=0,
+            client_kwargs={"timeout": 60}
         )
-        
-        # Test LLM connection
-        try:
-            test_response = llm.invoke("Hello")
-        except Exception as e:
-            raise
-        
-        # Updated Prompt Template - using ChatPromptTemplate for better compatibility
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a helpful assistant with knowledge about Krishna and Hindu philosophy. 
-            You have access to a retrieval tool to search for relevant information.
-            
-            When a user asks a question:
-            1. Use the retrieve tool to find relevant information
-            2. Based on the retrieved information, provide a comprehensive answer
-            3. Always start your answer with "Hare Krishna...."
-            4. If you don't find relevant information, say "I don't know" and don't provide a source
-            5. Do not show the raw tool calls or JSON - only provide the final answer
-            6. Cite the source
-            
-            Remember to actually execute the tool and use its results in your response."""),
-            ("human", "{input}"),
-            ("placeholder", "{agent_scratchpad}")
-        ])
-        
-        # Retriever Tool - with error handling
-        @tool
-        def retrieve(query: str) -> str:
-            """Retrieve information related to a query about Krishna and Hindu philosophy."""
-            try:
-                retrieved_docs = vector_store.similarity_search(query, k=3)
-                if not retrieved_docs:
-                    return "No relevant information found in the knowledge base."
-                
-                result = "\n\n".join(
-                    f"Source: {doc.metadata.get('source', 'unknown')}\nContent: {doc.page_content}" 
-                    for doc in retrieved_docs
-                )
-                return result
-            except Exception as e:
-                return f"Error retrieving information: {str(e)}"
-        
-        tools = [retrieve]
-        
-        # Create Agent with error handling
-        try:
-            agent = create_tool_calling_agent(llm, tools, prompt)
-            agent_executor = AgentExecutor(
-                agent=agent, 
-                tools=tools, 
-                verbose=False,  # Disable verbose to prevent raw output
-                max_iterations=5,  # Increase iterations to allow proper tool execution
-                max_execution_time=60,  # Increase timeout
-                return_intermediate_steps=False,  # Don't return intermediate steps
-                handle_parsing_errors=True  # Handle parsing errors gracefully
-            )
-            
-            return agent_executor
-            
-        except Exception as e:
-            raise
-            
+    
+    return init_chat_model(
+        os.getenv("CHAT_MODEL", "llama3"),
+        model_provider=model_provider,
+        temperature=0
+    )
+
+@functools.lru_cache(maxsize=256)
+def _retrieve_cached(query, source=None):
+    """Search the vector store and format the results (memoized per query string)"""
+    # Optional metadata pre-filter narrows the candidate set before the vector search.
+    # Not used by the retrieve tool yet: a hook for when documents carry a category to filter on
+    metadata_filter = {"source": source} if source else None
+    
+    retrieved_docs = get_vector_store().similarity_search(
+        query, k=RETRIEVAL_TOP_K, filter=metadata_filter
+    )
+    if not retrieved_docs:
+        return "No relevant information found in the knowledge base."
+    
+    # Truncated content keeps the prompt (and LLM decode time) small
+    parts = [None] * len(retrieved_docs)
+    for i, doc in enumerate(retrieved_docs):
+        parts[i] = "Source: " + (doc.metadata.get("source") or "unknown") + "\nContent: " + doc.page_content[:MAX_CONTEXT_CHARS]
+    return "\n\n".join(parts)
+
+# Retriever Tool - with error handling
+@tool
+def retrieve(query: str) -> str:
+    """Retrieve information related to a query about Krishna and Hindu philosophy."""
+    try:
+        return _retrieve_cached(query)
     except Exception as e:
-        raise
+        return f"Error retrieving information: {str(e)}"
 
-def apply_chat_styling():
-    """Apply styling specific to chat interface"""
-    st.markdown("""
+# Agent Prompt Template - built once at import
+_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a helpful assistant with knowledge about Krishna and Hindu philosophy. 
+    You have access to a retrieval tool to search for relevant information.
+    
+    When a user asks a question:
+    1. Use the retrieve tool to find relevant information
+    2. Based on the retrieved information, provide a comprehensive answer
+    3. Always start your answer with "Hare Krishna...."
+    4. If you don't find relevant information, say "I don't know" and don't provide a source
+    5. Do not show the raw tool calls or JSON - only provide the final answer
+    6. Cite the source
+    
+    Remember to actually execute the tool and use its results in your response."""),
+    ("human", "{input}"),
+    ("placeholder", "{agent_scratchpad}")
+])
+
+@st.cache_resource
+def get_agent_executor():
+    """Build the tool-calling agent (connections are validated lazily on the first real query)"""
+    tools = [retrieve]
+    agent = create_tool_calling_agent(get_llm(), tools, _PROMPT)
+    return AgentExecutor(
+        agent=agent, 
+        tools=tools, 
+        verbose=False,  # Disable verbose to prevent raw output
+        max_iterations=2,  # One tool call, then the final answer
+        max_execution_time=30,
+        early_stopping_method="force",  # Tool-calling agents only support "force"
+        return_intermediate_steps=False,  # Don't return intermediate steps
+        handle_parsing_errors=False  # Surface parsing errors instead of retrying the LLM
+    )
+
+# Direct RAG Prompt Template - context is retrieved up front, so one LLM call answers
+_RAG_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a helpful assistant with knowledge about Krishna and Hindu philosophy. 
+    Answer the user's question using only the retrieved context below.
+    
+    1. Always start your answer with "Hare Krishna...."
+    2. If the context does not contain relevant information, say "I don't know" and don't provide a source
+    3. Cite the source
+    
+    Context:
+    {context}"""),
+    ("human", "{input}")
+])
+
+@st.cache_resource
+def get_rag_chain():
+    """Build the retrieve-then-generate chain (single LLM call per question)"""
+    return (
+        RunnablePassthrough.assign(context=lambda inputs: _retrieve_cached(inputs["input"]))
+        | _RAG_PROMPT
+        | get_llm()
+        | StrOutputParser()
+    )
+
+def get_chat_chain():
+    """Return the runnable that answers chat questions (agent only when USE_AGENT=1)"""
+    # Build the vector store on the script thread so configuration errors (e.g. a missing
+    # EMBEDDING_MODEL) reach the init panel; this is local construction, not a network probe
+    get_vector_store()
+    
+    if USE_AGENT:
+        return get_agent_executor()
+    return get_rag_chain()
+
+# Chat interface CSS (static, so built once at import)
+CHAT_CSS = """
     <style>
     [data-testid="chat-message"] {
         background-color: rgba(255, 255, 255, 0.95) !important;
@@ -131,8 +213,14 @@ def apply_chat_styling():
         background-color: rgba(255, 255, 255, 0.9) !important;
         border-radius: 10px !important;
     }
+    .stChatMessage {
+        background-color: rgba(255, 255, 255, 0.9) !important;
+        padding: 10px !important;
+        border-radius: 5px !important;
+    }
     .stChatMessage, .stChatMessage * {
         color: black !important;
+        font-weight: 500;
     }
     .chat-container {
         background-color: rgba(255, 255, 255, 0.1);
@@ -141,7 +229,61 @@ def apply_chat_styling():
         margin: 10px 0;
     }
     </style>
-    """, unsafe_allow_html=True)
+    """
+
+def apply_chat_styling():
+    """Apply styling specific to chat interface"""
+    st.markdown(CHAT_CSS, unsafe_allow_html=True)
+
+def render_message(message):
+    """Render a single chat message"""
+    with st.chat_message("user" if isinstance(message, HumanMessage) else "assistant"):
+        st.markdown(message.content)
+
+def show_troubleshooting_steps():
+    """Show setup hints when Ollama or Chroma cannot be reached"""
+    st.error("Please check your environment configuration and Ollama service.")
+    st.markdown("**Troubleshooting steps:**")
+    st.markdown("1. Ensure Ollama is running: `ollama serve`")
+    st.markdown("2. Check if your models are available: `ollama list`")
+    st.markdown("3. Verify your .env file has all required variables")
+    st.markdown("4. Check if the Chroma database exists and is accessible")
+
+@st.cache_resource
+def get_event_loop():
+    """Start the event loop every chat turn runs on (kept for the whole process)"""
+    # The cached LLM's httpx.AsyncClient pools connections on the loop that first used them,
+    # so a fresh asyncio.run() per turn would leave it holding connections from a closed loop
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="chat-event-loop", daemon=True).start()
+    return loop
+
+async def run_stream(chain, question, on_text):
+    """Stream chain output token-by-token to on_text and return the full text"""
+    buf = []
+    async for event in chain.astream_events({"input": question}, version="v2"):
+        if event["event"] == "on_chat_model_start":
+            # Only the last model call is the answer; drop text streamed alongside earlier tool calls
+            buf.clear()
+        elif event["event"] == "on_chat_model_stream":
+            token = event["data"]["chunk"].content
+            if token:
+                buf.append(token)
+                on_text("".join(buf))
+    return "".join(buf)
+
+def stream_response(chain, question, placeholder):
+    """Run run_stream on the shared event loop and render its partial text into the placeholder"""
+    # Streamlit elements must be updated from the script thread, so the loop thread only queues text
+    updates = queue.Queue()
+    future = asyncio.run_coroutine_threadsafe(run_stream(chain, question, updates.put), get_event_loop())
+    future.add_done_callback(lambda _: updates.put(None))
+    try:
+        while (text := updates.get()) is not None:
+            placeholder.markdown(text)
+    finally:
+        future.cancel()  # No-op once finished; stops generation if the script run is interrupted
+    return future.result()
 
 def show_chatbot_page():
     """Main chatbot page function"""
@@ -158,15 +300,10 @@ def show_chatbot_page():
     
     # Initialize RAG components
     try:
-        agent_executor = initialize_rag_components()
+        chat_chain = get_chat_chain()
     except Exception as e:
         st.error(f"Failed to initialize chatbot: {str(e)}")
-        st.error("Please check your environment configuration and Ollama service.")
-        st.markdown("**Troubleshooting steps:**")
-        st.markdown("1. Ensure Ollama is running: `ollama serve`")
-        st.markdown("2. Check if your models are available: `ollama list`")
-        st.markdown("3. Verify your .env file has all required variables")
-        st.markdown("4. Check if the Chroma database exists and is accessible")
+        show_troubleshooting_steps()
         st.markdown('</div>', unsafe_allow_html=True)
         return
     
@@ -179,14 +316,24 @@ def show_chatbot_page():
         # Add welcome message
         welcome_msg = AIMessage("Hare Krishna! 🙏 I'm here to help you learn about Lord Krishna and Hindu philosophy. Ask me anything!")
         st.session_state.chat_messages.append(welcome_msg)
+    st.session_state.setdefault("human_count", 0)
+    
+    # Display chat history - one page of messages; older pages are loaded on demand
+    st.session_state.setdefault("history_page", 0)
+    messages = st.session_state.chat_messages
+    end = len(messages) - st.session_state.history_page * VISIBLE_MESSAGES
+    start = max(end - VISIBLE_MESSAGES, 0)
     
-    # Display chat history
-    for message in st.session_state.chat_messages:
-        with st.chat_message("user" if isinstance(message, HumanMessage) else "assistant"):
-            st.markdown(
-                f'<div style="color: black; font-weight: 500; background-color: rgba(255,255,255,0.9); padding: 10px; border-radius: 5px;">{message.content}</div>',
-                unsafe_allow_html=True
-            )
+    if start > 0 and st.button(f"⬆️ Load earlier messages ({start} more)"):
+        st.session_state.history_page += 1
+        st.rerun()
+    
+    for message in messages[start:end]:
+        render_message(message)
+    
+    if st.session_state.history_page and st.button("⬇️ Back to latest messages"):
+        st.session_state.history_page = 0
+        st.rerun()
     
     # Chat input
     user_question = st.chat_input("Ask me about Krishna, philosophy, or spiritual guidance...")
@@ -195,13 +342,12 @@ def show_chatbot_page():
         # Add user message to chat
         user_msg = HumanMessage(user_question)
         st.session_state.chat_messages.append(user_msg)
+        st.session_state.human_count += 1
+        st.session_state.history_page = 0  # Jump back to the latest page on the next rerun
         
         # Display user message
         with st.chat_message("user"):
-            st.markdown(
-                f'<div style="color: black; font-weight: 500; background-color: rgba(255,255,255,0.9); padding: 10px; border-radius: 5px;">{user_question}</div>',
-                unsafe_allow_html=True
-            )
+            st.markdown(user_question)
         
         # Generate AI response
         with st.chat_message("assistant"):
@@ -211,19 +357,10 @@ def show_chatbot_page():
                 # Show progress
                 response_placeholder.markdown("🤔 Thinking...")
                 
-                # Simple chat history formatting
-                chat_history_str = ""
-                for msg in st.session_state.chat_messages[:-1]:  # Exclude the just-added message
-                    role = "Human" if isinstance(msg, HumanMessage) else "Assistant"
-                    chat_history_str += f"{role}: {msg.content}\n"
-                
-                # Get response from agent with timeout
-                
-                result = agent_executor.invoke({
-                    "input": user_question
-                })
-                
-                ai_response = result.get("output", "No response generated")
+                # Stream response tokens as they are generated
+                ai_response = stream_response(
+                    chat_chain, user_question, response_placeholder
+                ) or "No response generated"
                 
                 # Clean up any remaining tool call artifacts
                 if "retrieve" in ai_response and "{" in ai_response:
@@ -233,23 +370,32 @@ def show_chatbot_page():
                 if not ai_response.startswith("Hare Krishna"):
                     ai_response = f"Hare Krishna! {ai_response}"
                 
-                # Display AI response
-                response_placeholder.markdown(
-                    f'<div style="color: black; font-weight: 500; background-color: rgba(255,255,255,0.9); padding: 10px; border-radius: 5px;">{ai_response}</div>',
-                    unsafe_allow_html=True
-                )
+                # Display final AI response
+                response_placeholder.markdown(ai_response)
                 
                 # Add AI message to chat history
                 ai_msg = AIMessage(ai_response)
                 st.session_state.chat_messages.append(ai_msg)
                 
+            except OutputParserException:
+                error_msg = "Hare Krishna! I couldn't understand how to answer that. Please try rephrasing your question."
+                
+                response_placeholder.error(error_msg)
+                
+                st.session_state.chat_messages.append(AIMessage(error_msg))
+                
+            except (ConnectionError, httpx.ConnectError) as e:
+                error_msg = f"Hare Krishna! I apologize, but I could not reach the model service: {str(e)}"
+                
+                response_placeholder.error(error_msg)
+                show_troubleshooting_steps()
+                
+                st.session_state.chat_messages.append(AIMessage(error_msg))
+                
             except Exception as e:
                 error_msg = f"Hare Krishna! I apologize, but I encountered an error: {str(e)}"
                 
-                response_placeholder.markdown(
-                    f'<div style="color: red; font-weight: 500; background-color: rgba(255,255,255,0.9); padding: 10px; border-radius: 5px;">{error_msg}</div>',
-                    unsafe_allow_html=True
-                )
+                response_placeholder.error(error_msg)
                 
                 st.session_state.chat_messages.append(AIMessage(error_msg))
     
@@ -260,12 +406,20 @@ def show_chatbot_page():
         st.header("📊 Chat Statistics")
         
         # Chat statistics
-        if len(st.session_state.chat_messages) > 1:  # Exclude welcome message
-            human_msgs = [m for m in st.session_state.chat_messages if isinstance(m, HumanMessage)]
-            st.metric("Questions Asked", len(human_msgs))
+        if st.session_state.human_count:
+            st.metric("Questions Asked", st.session_state.human_count)
+        
+        # Server-side tuning hints
+        with st.expander("⚙️ Ollama Performance Tips"):
+            st.markdown("Set these before running `ollama serve` so retrieval and generation can overlap:")
+            st.markdown("- `OLLAMA_NUM_PARALLEL=4` - serve concurrent requests")
+            st.markdown("- `OLLAMA_KEEP_ALIVE=30m` - keep models loaded between questions")
         
         # Clear chat button
         if st.button("🗑️ Clear Chat History"):
+            _retrieve_cached.cache_clear()
+            st.session_state.human_count = 0
+            st.session_state.history_page = 0
             st.session_state.chat_messages = [
                 AIMessage("Hare Krishna! 🙏 I'm here to help you learn about Lord Krishna and Hindu philosophy. Ask me anything!")
             ]
@@ -4,181 +4,212 @@ import os
 from dotenv import load_dotenv
 from langchain.chat_models import init_chat_model
 from langchain_core.prompts import PromptTemplate
+import math
 import random
+import re
+import logging
+import json
+import hashlib
+import sqlite3
+from contextlib import closing
 
 # Load environment variables
 load_dotenv()
 
-# Initialize chat model for quiz generation
-llm = init_chat_model(
-    os.getenv("CHAT_MODEL", "llama3"),
-    model_provider=os.getenv("MODEL_PROVIDER", "ollama"),
-    temperature=0.7
+# Set QUIZ_DEBUG=1 to log LLM responses that yield fewer questions than requested
+DEBUG = os.getenv("QUIZ_DEBUG") == "1"
+logger = logging.getLogger(__name__)
+
+# Chat model for quiz generation (created on first use, not at import)
+_llm = None
+
+def _get_llm():
+    global _llm
+    if _llm is None:
+        _llm = init_chat_model(
+            os.getenv("CHAT_MODEL", "llama3"),
+            model_provider=os.getenv("MODEL_PROVIDER", "ollama"),
+            temperature=0.7
+        )
+    return _llm
+
+# On-disk pool of previously generated questions, keyed by age group/topic/difficulty.
+# Bump PROMPT_VERSION whenever the question prompt or stored question format changes so stale questions are not served.
+QUIZ_CACHE_PATH = os.getenv("QUIZ_CACHE_PATH", ".quiz_cache.sqlite3")
+PROMPT_VERSION = "v6"
+QUESTION_POOL_LIMIT = 200
+OVERGENERATE_FACTOR = 1.25
+
+# One question block: QUESTION, options A-D, CORRECT letter and EXPLANATION (up to the next question).
+# Markers must start a line (optionally after markdown bold "**") and QUESTION/option letters are
+# case-sensitive, so text like "(like Arjuna)" or "Arjuna's question:" is never mistaken for a marker.
+# No field may run past the start of another QUESTION: line, so a malformed block is dropped
+# instead of being merged into the next question.
+_FIELD = r"(?:(?!^[ \t*]*QUESTION:).)"
+QUIZ_RE = re.compile(
+    r"^[ \t*]*QUESTION:[ \t*]*(?P<q>" + _FIELD + r"+?)\s*"
+    r"^[ \t*]*A\)[ \t]*(?P<a>" + _FIELD + r"+?)\s*"
+    r"^[ \t*]*B\)[ \t]*(?P<b>" + _FIELD + r"+?)\s*"
+    r"^[ \t*]*C\)[ \t]*(?P<c>" + _FIELD + r"+?)\s*"
+    r"^[ \t*]*D\)[ \t]*(?P<d>" + _FIELD + r"+?)\s*"
+    r"^[ \t*]*(?i:CORRECT):\W*(?P<correct>[ABCDabcd])\b" + _FIELD + r"*?"
+    r"^[ \t*]*(?i:EXPLANATION):[ \t*]*(?P<exp>" + _FIELD + r"+?)[\s*]*(?=^[ \t*]*QUESTION:|\Z)",
+    re.DOTALL | re.MULTILINE
 )
 
 # Age group configurations
 AGE_GROUPS = {
     "Children (5-12)": {
         "description": "Simple stories and basic concepts about Krishna",
-        "topics": ["Krishna's childhood", "Simple life lessons", "Basic stories", "Colors and festivals"]
+        "topics": ("Krishna's childhood", "Simple life lessons", "Basic stories", "Colors and festivals")
     },
     "Teenagers (13-18)": {
         "description": "More detailed stories with moral lessons",
-        "topics": ["Krishna's adventures", "Bhagavad Gita basics", "Friendship and values", "Life guidance"]
+        "topics": ("Krishna's adventures", "Bhagavad Gita basics", "Friendship and values", "Life guidance")
     },
     "Adults (19-60)": {
         "description": "Deep philosophical concepts and practical application",
-        "topics": ["Bhagavad Gita philosophy", "Karma yoga", "Life challenges", "Spiritual practices"]
+        "topics": ("Bhagavad Gita philosophy", "Karma yoga", "Life challenges", "Spiritual practices")
     },
     "Seniors (60+)": {
         "description": "Wisdom-focused content with spiritual depth",
-        "topics": ["Spiritual wisdom", "Life reflection", "Advanced philosophy", "Peace and devotion"]
+        "topics": ("Spiritual wisdom", "Life reflection", "Advanced philosophy", "Peace and devotion")
     }
 }
+AGE_GROUP_KEYS = tuple(AGE_GROUPS)
 
-def generate_quiz_question(age_group, topic, difficulty="medium"):
-    """Generate a quiz question using LLM based on age group and topic"""
-    
-    prompt = PromptTemplate.from_template("""
-    You are creating a quiz question about Krishna and Hindu philosophy for {age_group}.
-    
-    Topic: {topic}
-    Difficulty: {difficulty}
-    
-    Create ONE multiple choice question with 4 options (A, B, C, D) and indicate the correct answer.
-    
-    IMPORTANT: Instead of asking direct theoretical questions, create REAL-LIFE SCENARIOS that people in the {age_group} category commonly face, and connect these situations to Krishna's teachings from the Bhagavad Gita.
-    
-    Guidelines for creating scenarios:
-    - For Children (5-12): Use school situations, family conflicts, sharing toys, dealing with bullies, homework challenges
-    - For Teenagers (13-18): Use peer pressure, exam stress, friendship issues, career confusion, social media problems
-    - For Adults (19-60): Use workplace conflicts, family responsibilities, financial stress, relationship issues, career decisions
-    - For Seniors (60+): Use health concerns, family wisdom sharing, retirement decisions, legacy thoughts, spiritual growth
+# Real-life scenario themes per age group (only the relevant line is sent to the LLM)
+SCENARIO_HINTS = {
+    "Children (5-12)": "school, family conflicts, sharing toys, bullies, homework",
+    "Teenagers (13-18)": "peer pressure, exam stress, friendships, career confusion, social media",
+    "Adults (19-60)": "workplace conflicts, family duties, financial stress, relationships, career decisions",
+    "Seniors (60+)": "health concerns, sharing family wisdom, retirement, legacy, spiritual growth"
+}
+
+# Static instructions come first and the per-request fields last, so the prompt prefix is
+# byte-identical across calls and the model server can reuse its cached prefix
+QUIZ_PROMPT = PromptTemplate.from_template("""Write multiple-choice questions about Krishna's teachings in the Bhagavad Gita.
+Each question is a realistic scenario the audience faces, asking how the Gita guides them. Use language suited to the audience.
+Format each exactly as below, separated by a blank line:
+QUESTION: <scenario and question>
+A) <option>
+B) <option>
+C) <option>
+D) <option>
+CORRECT: <A/B/C/D>
+EXPLANATION: <why, citing the Gita teaching>
+---
+AUDIENCE: {age_group}
+SCENARIOS: {hint}
+TOPIC: {topic}
+DIFFICULTY: {difficulty}
+COUNT: {n}
+Generate now.
+""")
+
+def generate_quiz_questions(age_group, topic, difficulty="medium", n=1):
+    """Stream n quiz questions from a single LLM call, yielding each one as soon as it is complete"""
+    buffer = ""
+    pos = 0
+    parsed = 0
+    for chunk in _get_llm().stream(QUIZ_PROMPT.format(
+        age_group=age_group,
+        topic=topic,
+        difficulty=difficulty,
+        hint=SCENARIO_HINTS.get(age_group, "everyday life"),
+        n=n
+    )):
+        buffer += chunk.content
+        # A question is complete once the next QUESTION: marker has arrived after its explanation
+        match = QUIZ_RE.search(buffer, pos)
+        while match and match.end() < len(buffer):
+            yield _quiz_from_match(match)
+            parsed += 1
+            pos = match.end()
+            match = QUIZ_RE.search(buffer, pos)
     
-    The question should present a realistic situation and ask what Krishna's teachings would guide them to do, or how Gita principles apply to that situation.
+    # The last question is terminated by the end of the stream
+    for quiz_data in parse_quiz_questions(buffer[pos:]):
+        yield quiz_data
+        parsed += 1
     
-    Make the language and scenario complexity appropriate for {age_group}.
+    if DEBUG and parsed < n:
+        logger.warning("Parsed only %d of %d questions from quiz response: %r", parsed, n, buffer)
+
+def _open_question_pool():
+    """Open the on-disk question pool, creating the table on first use"""
+    conn = sqlite3.connect(QUIZ_CACHE_PATH)
+    conn.execute("CREATE TABLE IF NOT EXISTS question_pool (key TEXT PRIMARY KEY, questions TEXT NOT NULL)")
+    return conn
+
+def get_or_generate_questions(age_group, topic, difficulty, n, on_progress=None, seen=()):
+    """Serve n questions from the cached pool, only calling the LLM for the shortfall.
     
-    Format your response exactly as:
-    QUESTION: [Present a real-life scenario that the age group faces, then ask how Krishna's teachings from the Gita would guide their response]
-    A) [Option A - should reflect different approaches/mindsets]
-    B) [Option B - should reflect different approaches/mindsets] 
-    C) [Option C - should reflect different approaches/mindsets]
-    D) [Option D - should reflect different approaches/mindsets]
-    CORRECT: [A/B/C/D]
-    EXPLANATION: [Brief explanation connecting the correct choice to specific Krishna's teachings or Gita verses/principles, and why this approach aligns with dharmic living]
+    Questions whose text is in seen (what this session was already asked) are not served
+    again; the pool is topped up instead, so retakes keep getting new questions.
+    on_progress(done, total) is called as each newly generated question arrives.
+    """
+    key = hashlib.sha256(f"{age_group}|{topic}|{difficulty}|{PROMPT_VERSION}".encode()).hexdigest()
     
-    Start with "Hare Krishna! Here's your question:\n"
-    """)
+    with closing(_open_question_pool()) as conn:
+        row = conn.execute("SELECT questions FROM question_pool WHERE key = ?", (key,)).fetchone()
+        pool = json.loads(row[0]) if row else []
+        fresh = [quiz_data for quiz_data in pool if quiz_data["question"] not in seen]
+        
+        if len(fresh) < n:
+            # Ask for a few extra so occasional parse failures don't cost a second LLM call;
+            # any surplus simply stays in the pool for later quizzes
+            needed = n - len(fresh)
+            n_request = max(needed, math.ceil(needed * OVERGENERATE_FACTOR))
+            for done, quiz_data in enumerate(generate_quiz_questions(age_group, topic, difficulty, n_request), start=1):
+                pool.append(quiz_data)
+                if quiz_data["question"] not in seen:
+                    fresh.append(quiz_data)
+                if on_progress:
+                    on_progress(min(done, needed), needed)
+            pool = pool[-QUESTION_POOL_LIMIT:]
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO question_pool (key, questions) VALUES (?, ?)",
+                    (key, json.dumps(pool))
+                )
     
-    try:
-        response = llm.invoke(prompt.format(
-            age_group=age_group,
-            topic=topic,
-            difficulty=difficulty
-        ))
-        return response.content if hasattr(response, 'content') else str(response)
-    except Exception as e:
-        return f"Error generating question: {str(e)}"
+    return random.sample(fresh, min(n, len(fresh)))
 
-def parse_quiz_question(response):
-    """Parse the LLM response into structured quiz data"""
-    try:
-        lines = [line.strip() for line in response.split('\n') if line.strip()]
-        question = ""
-        options = {}
-        correct = ""
-        explanation = ""
-        
-        # Print debug info
-        print(f"Parsing response with {len(lines)} lines")
-        for i, line in enumerate(lines):
-            print(f"Line {i}: {repr(line)}")
-        
-        # More flexible parsing
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            line_upper = line.upper()
-            
-            # Look for question - can be on same line as "QUESTION:" or next line
-            if "QUESTION:" in line_upper:
-                # Question might be on same line after colon
-                if ":" in line:
-                    question_part = line.split(":", 1)[1].strip()
-                    if question_part:
-                        question = question_part
-                    else:
-                        # Question is on next line
-                        i += 1
-                        if i < len(lines):
-                            question = lines[i].strip()
-            
-            # Look for options A), B), C), D)
-            elif line.startswith(("A)", "B)", "C)", "D)")):
-                key = line[0].upper()
-                value = line[2:].strip() if len(line) > 2 else ""
-                # Remove extra closing parenthesis if present
-                if value.startswith(")"):
-                    value = value[1:].strip()
-                options[key] = value
-            
-            # Look for correct answer
-            elif "CORRECT:" in line_upper:
-                correct_part = line.split(":", 1)[1].strip().upper()
-                # Extract just the letter (A, B, C, or D)
-                for char in correct_part:
-                    if char in ['A', 'B', 'C', 'D']:
-                        correct = char
-                        break
-            
-            # Look for explanation
-            elif "EXPLANATION:" in line_upper:
-                explanation_part = line.split(":", 1)[1].strip()
-                if explanation_part:
-                    explanation = explanation_part
-                # Collect remaining lines as part of explanation
-                j = i + 1
-                while j < len(lines):
-                    next_line = lines[j].strip()
-                    # Stop if we hit another section
-                    if any(keyword in next_line.upper() for keyword in ["QUESTION:", "CORRECT:", "A)", "B)", "C)", "D)"]):
-                        break
-                    explanation += " " + next_line
-                    j += 1
-                i = j - 1  # Adjust index since we processed multiple lines
-            
-            i += 1
-        
-        # Debug output
-        print(f"Parsed question: {repr(question)}")
-        print(f"Parsed options: {options}")
-        print(f"Parsed correct: {repr(correct)}")
-        print(f"Parsed explanation: {repr(explanation)}")
-        
-        # Validate that we have minimum required components
-        if not question:
-            print("Missing question")
-            return None
-        if len(options) < 4:
-            print(f"Missing options - only found {len(options)}")
-            return None
-        if correct not in ['A', 'B', 'C', 'D']:
-            print(f"Invalid correct answer: {repr(correct)}")
-            return None
-            
-        return {
-            "question": question,
-            "options": options,
-            "correct": correct,
-            "explanation": explanation
-        }
-        
-    except Exception as e:
-        print(f"Parsing error: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
+def parse_quiz_questions(response):
+    """Parse every question in a multi-question LLM response"""
+    return [_quiz_from_match(match) for match in QUIZ_RE.finditer(response)]
+
+def _quiz_from_match(match):
+    """Build the quiz dict from a QUIZ_RE match"""
+    options = {key.upper(): match[key].strip() for key in "abcd"}
+    # Radio labels are rendered once here instead of on every rerun
+    rendered_options = [f"{key}) {value}" for key, value in options.items()]
+    return {
+        "question": match["q"].strip(),
+        "options": options,
+        "rendered_options": rendered_options,
+        "option_to_letter": {label: label[0] for label in rendered_options},
+        "correct": match["correct"].upper(),
+        "explanation": " ".join(match["exp"].split())
+    }
+
+def reset_quiz_state(**overrides):
+    """Reset every quiz session key (one key per field, so updates only touch what changed)"""
+    state = {
+        "qs_questions": [],  # Store multiple questions
+        "qs_idx": 0,  # Current question index
+        "qs_total": 5,  # Number of questions selected
+        "qs_score": 0,
+        "qs_answered": False,
+        "qs_selected": None,  # Selected answer letter
+        "qs_is_correct": False,
+        "qs_started": False,
+        "qs_completed": False
+    }
+    state.update(overrides)
+    for key, value in state.items():
+        st.session_state[key] = value
 
 def show_quiz_page():
     """Main quiz page function"""
@@ -189,23 +220,16 @@ def show_quiz_page():
     st.markdown("Test your knowledge about Lord Krishna and Hindu philosophy!")
     
     # Initialize session state
-    if "quiz_state" not in st.session_state:
-        st.session_state.quiz_state = {
-            "questions": [],  # Store multiple questions
-            "current_question_index": 0,
-            "total_questions_selected": 5,  # Default number
-            "score": 0,
-            "answered": False,
-            "selected_answer": None,
-            "quiz_started": False,
-            "quiz_completed": False
-        }
+    if "qs_started" not in st.session_state:
+        reset_quiz_state()
+    # Questions already asked this session (kept across retakes, unlike the quiz state)
+    st.session_state.setdefault("qs_seen", set())
     
     # Age group selection
     st.subheader("👤 Select Your Age Group")
     selected_age_group = st.selectbox(
         "Choose your age group for appropriate questions:",
-        list(AGE_GROUPS.keys()),
+        AGE_GROUP_KEYS,
         key="age_group_select"
     )
     
@@ -226,7 +250,7 @@ def show_quiz_page():
         st.subheader("🔢 Number of Questions")
         num_questions = st.selectbox(
             "How many questions would you like?",
-            [3, 5, 10, 15, 20],
+            (3, 5, 10, 15, 20),
             index=1,  # Default to 5
             key="num_questions_select"
         )
@@ -236,69 +260,63 @@ def show_quiz_page():
         if selected_age_group in ["Adults (19-60)", "Seniors (60+)"]:
             difficulty = st.selectbox(
                 "Select difficulty:",
-                ["easy", "medium", "hard"],
+                ("easy", "medium", "hard"),
                 index=1,
                 key="difficulty_select"
             )
         elif selected_age_group == "Teenagers (13-18)":
             difficulty = st.selectbox(
                 "Select difficulty:",
-                ["easy", "medium"],
+                ("easy", "medium"),
                 key="difficulty_select_teen"
             )
     
     # Start Quiz Button (only show if quiz hasn't started)
-    if not st.session_state.quiz_state["quiz_started"] and not st.session_state.quiz_state["quiz_completed"]:
+    if not st.session_state.qs_started and not st.session_state.qs_completed:
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
             if st.button("🚀 Start Quiz", use_container_width=True, key="start_quiz_btn"):
                 with st.spinner(f"Generating your {num_questions} questions..."):
                     try:
                         # Reset quiz state
-                        st.session_state.quiz_state = {
-                            "questions": [],
-                            "current_question_index": 0,
-                            "total_questions_selected": num_questions,
-                            "score": 0,
-                            "answered": False,
-                            "selected_answer": None,
-                            "quiz_started": True,
-                            "quiz_completed": False
-                        }
+                        reset_quiz_state(qs_total=num_questions, qs_started=True)
                         
-                        # Generate all questions at once
-                        questions = []
-                        for i in range(num_questions):
-                            st.write(f"Generating question {i+1}/{num_questions}...")
-                            response = generate_quiz_question(selected_age_group, selected_topic, difficulty)
-                            quiz_data = parse_quiz_question(response)
-                            
-                            if quiz_data and quiz_data.get("question") and quiz_data.get("options"):
-                                questions.append(quiz_data)
-                            else:
-                                st.warning(f"Failed to generate question {i+1}. Retrying...")
-                                # Retry once
-                                response = generate_quiz_question(selected_age_group, selected_topic, difficulty)
-                                quiz_data = parse_quiz_question(response)
-                                if quiz_data and quiz_data.get("question") and quiz_data.get("options"):
-                                    questions.append(quiz_data)
+                        progress_bar = st.progress(0.0, text="Generating questions...")
+                        
+                        def show_progress(done, total):
+                            progress_bar.progress(min(done / total, 1.0), text=f"Generated {done}/{total} questions...")
+                        
+                        # Serve questions from the cache, streaming any shortfall from a single LLM call
+                        questions = get_or_generate_questions(
+                            selected_age_group, selected_topic, difficulty, num_questions,
+                            on_progress=show_progress, seen=st.session_state.qs_seen
+                        )
+                        
+                        # Top up once if some questions failed to parse
+                        if len(questions) < num_questions:
+                            st.warning(f"Only {len(questions)} of {num_questions} questions were usable. Generating the rest...")
+                            questions = get_or_generate_questions(
+                                selected_age_group, selected_topic, difficulty, num_questions,
+                                on_progress=show_progress, seen=st.session_state.qs_seen
+                            )
                         
                         if questions:
-                            st.session_state.quiz_state["questions"] = questions
+                            st.session_state.qs_questions = questions
+                            st.session_state.qs_seen.update(q["question"] for q in questions)
                             st.success(f"✅ Generated {len(questions)} questions! Let's start the quiz!")
                             st.rerun()
                         else:
                             st.error("Failed to generate questions. Please try again.")
-                            st.session_state.quiz_state["quiz_started"] = False
+                            st.session_state.qs_started = False
                         
                     except Exception as e:
                         st.error(f"Error generating questions: {str(e)}")
-                        st.session_state.quiz_state["quiz_started"] = False
+                        st.session_state.qs_started = False
     
     # Display quiz in progress
-    elif st.session_state.quiz_state["quiz_started"] and not st.session_state.quiz_state["quiz_completed"]:
-        questions = st.session_state.quiz_state["questions"]
-        current_index = st.session_state.quiz_state["current_question_index"]
+    elif st.session_state.qs_started and not st.session_state.qs_completed:
+        questions = st.session_state.qs_questions
+        current_index = st.session_state.qs_idx
         
         if current_index < len(questions):
             # Progress indicator
@@ -313,14 +331,10 @@ def show_quiz_page():
             st.markdown(f"**{current_question['question']}**")
             
             # Answer options
-            if not st.session_state.quiz_state["answered"]:
-                answer_options = []
-                for key in sorted(current_question["options"].keys()):
-                    answer_options.append(f"{key}) {current_question['options'][key]}")
-                
+            if not st.session_state.qs_answered:
                 selected = st.radio(
                     "Choose your answer:",
-                    answer_options,
+                    current_question["rendered_options"],
                     key=f"answer_radio_{current_index}"
                 )
                 
@@ -328,31 +342,30 @@ def show_quiz_page():
                 with col2:
                     if st.button("✅ Submit Answer", use_container_width=True, key=f"submit_answer_btn_{current_index}"):
                         if selected:
-                            selected_letter = selected[0]  # Get A, B, C, or D
-                            st.session_state.quiz_state["selected_answer"] = selected_letter
-                            st.session_state.quiz_state["answered"] = True
+                            selected_letter = current_question["option_to_letter"][selected]
+                            is_correct = selected_letter == current_question["correct"]
+                            st.session_state.qs_selected = selected_letter
+                            st.session_state.qs_is_correct = is_correct
+                            st.session_state.qs_answered = True
                             
-                            if selected_letter == current_question["correct"]:
-                                st.session_state.quiz_state["score"] += 1
+                            if is_correct:
+                                st.session_state.qs_score += 1
                             
                             st.rerun()
             
             # Show results after answering
-            if st.session_state.quiz_state["answered"]:
-                selected_answer = st.session_state.quiz_state["selected_answer"]
-                correct_answer = current_question["correct"]
-                
-                if selected_answer == correct_answer:
+            if st.session_state.qs_answered:
+                if st.session_state.qs_is_correct:
                     st.success("🎉 Correct! Well done!")
                 else:
-                    st.error(f"❌ Incorrect. The correct answer was {correct_answer}.")
+                    st.error(f"❌ Incorrect. The correct answer was {current_question['correct']}.")
                 
                 # Show explanation
                 if current_question["explanation"]:
                     st.info(f"📚 **Explanation:** {current_question['explanation']}")
                 
                 # Current score
-                score = st.session_state.quiz_state["score"]
+                score = st.session_state.qs_score
                 current_q_num = current_index + 1
                 col1, col2 = st.columns(2)
                 with col1:
@@ -365,22 +378,23 @@ def show_quiz_page():
                 with col2:
                     if current_index + 1 < len(questions):
                         if st.button("➡️ Next Question", use_container_width=True, key=f"next_question_btn_{current_index}"):
-                            st.session_state.quiz_state["current_question_index"] += 1
-                            st.session_state.quiz_state["answered"] = False
-                            st.session_state.quiz_state["selected_answer"] = None
+                            st.session_state.qs_idx += 1
+                            st.session_state.qs_answered = False
+                            st.session_state.qs_selected = None
+                            st.session_state.qs_is_correct = False
                             st.rerun()
                     else:
                         if st.button("🏁 Finish Quiz", use_container_width=True, key="finish_quiz_btn"):
-                            st.session_state.quiz_state["quiz_completed"] = True
+                            st.session_state.qs_completed = True
                             st.rerun()
     
     # Show quiz results
-    elif st.session_state.quiz_state["quiz_completed"]:
+    elif st.session_state.qs_completed:
         st.markdown("---")
         st.subheader("🎊 Quiz Completed!")
         
-        score = st.session_state.quiz_state["score"]
-        total = st.session_state.quiz_state["total_questions_selected"]
+        score = st.session_state.qs_score
+        total = st.session_state.qs_total
         percentage = (score / total) * 100
         
         col1, col2, col3 = st.columns(3)
@@ -414,20 +428,11 @@ def show_quiz_page():
         with col2:
             if st.button("🔄 Take Another Quiz", use_container_width=True, key="restart_quiz_btn"):
                 # Reset everything
-                st.session_state.quiz_state = {
-                    "questions": [],
-                    "current_question_index": 0,
-                    "total_questions_selected": 5,
-                    "score": 0,
-                    "answered": False,
-                    "selected_answer": None,
-                    "quiz_started": False,
-                    "quiz_completed": False
-                }
+                reset_quiz_state()
                 st.rerun()
     
     # Instructions (show when no quiz is active)
-    if not st.session_state.quiz_state["quiz_started"] and not st.session_state.quiz_state["quiz_completed"]:
+    if not st.session_state.qs_started and not st.session_state.qs_completed:
         st.markdown("---")
         st.markdown("### 🚀 How to Start:")
         st.markdown("""
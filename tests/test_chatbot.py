@@ -0,0 +1,104 @@
+# tests/test_chatbot.py - Chat streaming tests
+import asyncio
+from types import SimpleNamespace
+
+from custom_pages import chatbot
+
+
+class FakePlaceholder:
+    def __init__(self):
+        self.rendered = []
+
+    def markdown(self, text):
+        self.rendered.append(text)
+
+
+class FakeChain:
+    def __init__(self, events):
+        self.events = events
+
+    async def astream_events(self, inputs, version):
+        for event in self.events:
+            yield event
+
+
+def model_start():
+    return {"event": "on_chat_model_start", "data": {}}
+
+
+def token(text):
+    return {"event": "on_chat_model_stream", "data": {"chunk": SimpleNamespace(content=text)}}
+
+
+def test_run_stream_returns_only_final_model_call():
+    chain = FakeChain([
+        model_start(),
+        token("Let me look that up."),
+        token(""),  # Tool-call chunk with no text
+        {"event": "on_tool_end", "data": {}},
+        model_start(),
+        token("Hare Krishna! "),
+        token("Act without attachment."),
+    ])
+    placeholder = FakePlaceholder()
+
+    result = chatbot.stream_response(chain, "What is karma yoga?", placeholder)
+
+    assert result == "Hare Krishna! Act without attachment."
+    assert placeholder.rendered[-1] == result
+
+
+class LoopBoundChain(FakeChain):
+    """Like a cached LLM client: its pooled connections belong to the loop of the first turn"""
+
+    loop = None
+
+    async def astream_events(self, inputs, version):
+        loop = asyncio.get_running_loop()
+        if self.loop is None:
+            self.loop = loop
+        elif self.loop is not loop or loop.is_closed():
+            raise RuntimeError("Event loop is closed")
+        async for event in super().astream_events(inputs, version):
+            yield event
+
+
+def test_consecutive_turns_share_the_event_loop():
+    chain = LoopBoundChain([model_start(), token("Hare Krishna!")])
+
+    for question in ("Who is Krishna?", "Who is Arjuna?"):
+        placeholder = FakePlaceholder()
+        assert chatbot.stream_response(chain, question, placeholder) == "Hare Krishna!"
+        assert placeholder.rendered == ["Hare Krishna!"]
+
+
+def test_stream_errors_reach_the_caller():
+    class FailingChain:
+        async def astream_events(self, inputs, version):
+            raise ConnectionError("Ollama is not running")
+            yield
+
+    try:
+        chatbot.stream_response(FailingChain(), "Who is Krishna?", FakePlaceholder())
+    except ConnectionError as e:
+        assert "Ollama" in str(e)
+    else:
+        raise AssertionError("ConnectionError was swallowed")
+
+
+def test_retrieve_asks_the_index_for_top_k_only(monkeypatch):
+    calls = []
+
+    class FakeStore:
+        def similarity_search(self, query, k, filter=None):
+            calls.append((query, k, filter))
+            return [SimpleNamespace(page_content="x" * 1000, metadata={"source": "gita.txt"})]
+
+    monkeypatch.setattr(chatbot, "get_vector_store", lambda: FakeStore())
+    chatbot._retrieve_cached.cache_clear()
+
+    result = chatbot._retrieve_cached("What is dharma?")
+    chatbot._retrieve_cached.cache_clear()
+
+    assert calls == [("What is dharma?", chatbot.RETRIEVAL_TOP_K, None)]
+    assert result == "Source: gita.txt\nContent: " + "x" * chatbot.MAX_CONTEXT_CHARS
@@ -0,0 +1,136 @@
+# tests/test_quiz.py - Quiz response parsing tests
+from types import SimpleNamespace
+
+from custom_pages import quiz
+
+
+def make_block(question, correct="B", explanation="Krishna teaches duty without attachment."):
+    return (
+        f"QUESTION: {question}\n"
+        "A) Run away\n"
+        "B) Do your duty calmly\n"
+        "C) Blame others\n"
+        "D) Give up\n"
+        f"CORRECT: {correct}\n"
+        f"EXPLANATION: {explanation}\n"
+    )
+
+
+def test_parses_multiple_questions():
+    response = "Hare Krishna! Here are your questions:\n\n" + make_block("Q1?") + "\n" + make_block("Q2?", correct="C")
+    questions = quiz.parse_quiz_questions(response)
+
+    assert [q["question"] for q in questions] == ["Q1?", "Q2?"]
+    assert [q["correct"] for q in questions] == ["B", "C"]
+    assert questions[0]["options"] == {
+        "A": "Run away",
+        "B": "Do your duty calmly",
+        "C": "Blame others",
+        "D": "Give up",
+    }
+    assert questions[0]["rendered_options"][1] == "B) Do your duty calmly"
+    assert questions[0]["option_to_letter"]["D) Give up"] == "D"
+
+
+def test_parenthesised_words_are_not_option_markers():
+    question = "Your friend (like Arjuna) is afraid of an exam (Karma). What would the Gita (Radha) suggest?"
+    questions = quiz.parse_quiz_questions(make_block(question))
+
+    assert len(questions) == 1
+    assert questions[0]["question"] == question
+    assert questions[0]["options"]["A"] == "Run away"
+
+
+def test_lowercase_question_in_explanation_does_not_end_it():
+    explanation = "Krishna answers Arjuna's question: act without attachment."
+    response = make_block("Q1?", explanation=explanation) + "\n" + make_block("Q2?")
+    questions = quiz.parse_quiz_questions(response)
+
+    assert [q["question"] for q in questions] == ["Q1?", "Q2?"]
+    assert questions[0]["explanation"] == explanation
+
+
+def test_block_missing_correct_is_dropped_not_merged():
+    malformed = make_block("Q1?").replace("CORRECT: B\n", "")
+    response = malformed + "\n" + make_block("Q2?", correct="D", explanation="Second explanation.")
+    questions = quiz.parse_quiz_questions(response)
+
+    assert len(questions) == 1
+    assert questions[0]["question"] == "Q2?"
+    assert questions[0]["options"]["A"] == "Run away"
+    assert questions[0]["correct"] == "D"
+    assert questions[0]["explanation"] == "Second explanation."
+
+
+def test_markdown_bold_markers():
+    response = make_block("Q1?").replace("QUESTION:", "**QUESTION:**").replace("CORRECT: B", "**CORRECT:** [B]")
+    questions = quiz.parse_quiz_questions(response)
+
+    assert len(questions) == 1
+    assert questions[0]["question"] == "Q1?"
+    assert questions[0]["correct"] == "B"
+
+
+def test_generate_streams_questions_as_they_complete(monkeypatch):
+    question = "Your friend (like Arjuna) is afraid?"
+    explanation = "Krishna answers Arjuna's question: act without attachment."
+    text = make_block(question, explanation=explanation) + "\n" + make_block("Q2?").replace("CORRECT: B\n", "") + "\n" + make_block("Q3?")
+    chunks = [text[i:i + 7] for i in range(0, len(text), 7)]
+    consumed = []
+
+    class FakeLLM:
+        def stream(self, prompt):
+            for chunk in chunks:
+                consumed.append(chunk)
+                yield SimpleNamespace(content=chunk)
+
+    monkeypatch.setattr(quiz, "_llm", FakeLLM())
+    generator = quiz.generate_quiz_questions("Children (5-12)", "Basic stories", "easy", 3)
+
+    first = next(generator)
+    assert first["question"] == question
+    assert first["explanation"] == explanation
+    assert len(consumed) < len(chunks)  # Yielded before the stream finished
+
+    rest = list(generator)
+    assert [q["question"] for q in rest] == ["Q3?"]
+
+
+def test_debug_logs_only_short_responses(monkeypatch, caplog):
+    class FakeLLM:
+        def __init__(self, text):
+            self.text = text
+
+        def stream(self, prompt):
+            yield SimpleNamespace(content=self.text)
+
+    monkeypatch.setattr(quiz, "DEBUG", True)
+
+    monkeypatch.setattr(quiz, "_llm", FakeLLM(make_block("Q1?") + "\n" + make_block("Q2?")))
+    assert len(list(quiz.generate_quiz_questions("Adults (19-60)", "Karma yoga", "hard", 2))) == 2
+    assert not caplog.records
+
+    monkeypatch.setattr(quiz, "_llm", FakeLLM(make_block("Q1?")))
+    assert len(list(quiz.generate_quiz_questions("Adults (19-60)", "Karma yoga", "hard", 2))) == 1
+    assert len(caplog.records) == 1
+    assert "Parsed only 1 of 2" in caplog.records[0].getMessage()
+
+
+def test_retakes_get_questions_the_session_has_not_seen(monkeypatch, tmp_path):
+    counter = iter(range(1000))
+
+    class FakeLLM:
+        def stream(self, prompt):
+            count = int(prompt.split("COUNT: ")[1].split()[0])
+            yield SimpleNamespace(content="\n".join(make_block(f"Q{next(counter)}?") for _ in range(count)))
+
+    monkeypatch.setattr(quiz, "QUIZ_CACHE_PATH", str(tmp_path / "pool.sqlite3"))
+    monkeypatch.setattr(quiz, "_llm", FakeLLM())
+    seen = set()
+
+    for _ in range(3):
+        questions = quiz.get_or_generate_questions("Teens (13-18)", "Bhagavad Gita basics", "medium", 2, seen=seen)
+        texts = {q["question"] for q in questions}
+        assert len(texts) == 2
+        assert not texts & seen
+        seen |= texts